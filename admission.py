@@ -0,0 +1,345 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from config import Config
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class TokenBucket:
+    """Classic token bucket: refills at `rate` tokens/second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self) -> Tuple[bool, float]:
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class ClientRateLimiter:
+    """Per-client token buckets, evicting the least recently seen clients."""
+
+    def __init__(self, name: str, per_minute: float, burst: int, max_clients: int = 10000):
+        self.name = name
+        self.enabled = per_minute > 0
+        self.rate = per_minute / 60.0
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    def check(self, client_id: str):
+        """Raise a 429 with Retry-After if the client is over its rate limit."""
+        if not self.enabled:
+            return
+
+        bucket = self.buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self.buckets[client_id] = bucket
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client_id)
+
+        allowed, retry_after = bucket.try_acquire()
+        if allowed:
+            self.allowed += 1
+            return
+
+        self.rejected += 1
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many {self.name} requests, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "per_minute": self.rate * 60,
+            "burst": self.burst,
+            "tracked_clients": len(self.buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class ConcurrencyGate:
+    """Bounded concurrency with a queue-wait deadline.
+
+    Requests that would have to wait longer than `queue_deadline` seconds for a
+    slot are rejected straight away with a 503 instead of piling up.
+    """
+
+    def __init__(self, name: str, limit: int, queue_deadline: float):
+        self.name = name
+        self.limit = max(limit, 1)
+        self.queue_deadline = queue_deadline
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Exponentially weighted average of how long a slot is held
+        self.avg_service_time = 0.0
+
+    def expected_wait(self) -> float:
+        """Rough estimate of how long a new arrival would queue for a slot."""
+        if self.in_flight < self.limit:
+            return 0.0
+        return (self.waiting + 1) / self.limit * self.avg_service_time
+
+    def _reject(self, retry_after: float):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is busy processing {self.name} requests, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    @asynccontextmanager
+    async def slot(self, defer_while: Optional[Callable[[], bool]] = None):
+        """Hold one slot for the duration of the block.
+
+        `defer_while` lets lower-priority work stand aside: while it returns
+        True the caller keeps waiting (still bounded by the queue deadline).
+        """
+        expected = self.expected_wait()
+        if expected > self.queue_deadline:
+            self._reject(expected)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_deadline
+
+        self.waiting += 1
+        try:
+            while defer_while is not None and defer_while():
+                if loop.time() >= deadline:
+                    self._reject(self.queue_deadline)
+                await asyncio.sleep(0.05)
+
+            if not self._semaphore.locked():
+                # Free slot: take it without a timeout, which would otherwise
+                # fire before the acquire runs when the deadline is 0
+                await self._semaphore.acquire()
+            else:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self._reject(max(self.expected_wait(), 1))
+                try:
+                    await asyncio.wait_for(self._semaphore.acquire(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    self._reject(max(self.expected_wait(), self.queue_deadline))
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started_at
+            if self.avg_service_time:
+                self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * elapsed
+            else:
+                self.avg_service_time = elapsed
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "queue_deadline_seconds": self.queue_deadline,
+            "avg_service_seconds": round(self.avg_service_time, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class CpuLoadMonitor:
+    """CPU load as a fraction of the CPU this process may actually use.
+
+    In a container the host load average and core count say nothing about the
+    container's own quota, so when cgroup CPU accounting is available (v2
+    `cpu.max`/`cpu.stat`, or v1 `cpu.cfs_*`/`cpuacct.usage`) the cgroup's usage
+    is measured against its quota. Elsewhere the 1-minute load average per core
+    is used.
+    """
+
+    SAMPLE_INTERVAL_SECONDS = 1.0
+
+    def __init__(self, cgroup_root: str = "/sys/fs/cgroup"):
+        self.cgroup_root = cgroup_root
+        self.source = "cgroup" if self._cgroup_usage_seconds() is not None else "loadavg"
+        self._last_sample: Optional[Tuple[float, float]] = None
+        self._last_load: Optional[float] = None
+
+    def _cgroup_usage_seconds(self) -> Optional[float]:
+        stat = _read_file(os.path.join(self.cgroup_root, "cpu.stat"))
+        if stat:
+            for line in stat.splitlines():
+                key, _, value = line.partition(" ")
+                if key == "usage_usec":
+                    return int(value) / 1e6
+
+        usage = _read_file(os.path.join(self.cgroup_root, "cpuacct", "cpuacct.usage"))
+        if usage:
+            return int(usage) / 1e9
+        return None
+
+    def _cgroup_cpus(self) -> float:
+        """CPUs granted by the cgroup quota, or all cores when unlimited."""
+        cpu_max = _read_file(os.path.join(self.cgroup_root, "cpu.max"))
+        if cpu_max:
+            quota, _, period = cpu_max.partition(" ")
+            if quota != "max":
+                return int(quota) / int(period)
+        else:
+            quota = _read_file(os.path.join(self.cgroup_root, "cpu", "cpu.cfs_quota_us"))
+            period = _read_file(os.path.join(self.cgroup_root, "cpu", "cpu.cfs_period_us"))
+            if quota and period and int(quota) > 0:
+                return int(quota) / int(period)
+        return float(os.cpu_count() or 1)
+
+    def load(self) -> Optional[float]:
+        """Current load per available CPU, or None where it cannot be measured."""
+        if self.source == "loadavg":
+            try:
+                return os.getloadavg()[0] / (os.cpu_count() or 1)
+            except (AttributeError, OSError):
+                return None
+
+        # Usage counters are cumulative, so load is the rate between samples
+        now = time.monotonic()
+        if self._last_sample and now - self._last_sample[0] < self.SAMPLE_INTERVAL_SECONDS:
+            return self._last_load
+
+        usage = self._cgroup_usage_seconds()
+        if usage is None:
+            return None
+        if self._last_sample:
+            sampled_at, last_usage = self._last_sample
+            self._last_load = (usage - last_usage) / (now - sampled_at) / self._cgroup_cpus()
+        self._last_sample = (now, usage)
+        return self._last_load
+
+
+class AdmissionController:
+    """Rate limiting, concurrency limits and load shedding for /query and /upload."""
+
+    def __init__(self, config: Config | None = None):
+        self.config = config or Config()
+
+        self.query_limiter = ClientRateLimiter(
+            "query",
+            self.config.QUERY_RATE_LIMIT_PER_MINUTE,
+            self.config.QUERY_RATE_LIMIT_BURST,
+        )
+        self.upload_limiter = ClientRateLimiter(
+            "upload",
+            self.config.UPLOAD_RATE_LIMIT_PER_MINUTE,
+            self.config.UPLOAD_RATE_LIMIT_BURST,
+        )
+        self.query_gate = ConcurrencyGate(
+            "query",
+            self.config.MAX_CONCURRENT_QUERIES,
+            self.config.QUERY_QUEUE_DEADLINE_SECONDS,
+        )
+        self.upload_gate = ConcurrencyGate(
+            "upload",
+            self.config.MAX_CONCURRENT_UPLOADS,
+            self.config.UPLOAD_QUEUE_DEADLINE_SECONDS,
+        )
+        self.cpu_monitor = CpuLoadMonitor()
+
+    def cpu_saturated(self) -> bool:
+        load = self.cpu_monitor.load()
+        return load is not None and load >= self.config.CPU_SATURATION_THRESHOLD
+
+    def _queries_need_priority(self) -> bool:
+        # Ingestion stands aside when queries are queued, or when queries are
+        # running on a CPU that is already saturated.
+        if self.query_gate.waiting > 0:
+            return True
+        return self.query_gate.in_flight > 0 and self.cpu_saturated()
+
+    @asynccontextmanager
+    async def admit_query(self, client_id: str):
+        self.query_limiter.check(client_id)
+        async with self.query_gate.slot():
+            yield
+
+    def check_upload_request(self, client_id: str, content_length: Optional[str]):
+        """Header-only upload checks, run before the request body is received.
+
+        Oversized or unsized bodies are refused before spending a rate-limit
+        token, so only plausible uploads count against the client.
+        """
+        if content_length is None:
+            raise HTTPException(status_code=411, detail="Content-Length header is required for uploads")
+        try:
+            body_size = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+
+        max_body_size = self.config.MAX_FILE_SIZE_MB * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES
+        if body_size > max_body_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds {self.config.MAX_FILE_SIZE_MB}MB limit"
+            )
+
+        self.upload_limiter.check(client_id)
+
+    @asynccontextmanager
+    async def upload_slot(self):
+        """Concurrency slot for processing an already validated upload."""
+        async with self.upload_gate.slot(defer_while=self._queries_need_priority):
+            yield
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "cpu_load": self.cpu_monitor.load(),
+            "cpu_load_source": self.cpu_monitor.source,
+            "cpu_saturated": self.cpu_saturated(),
+            "rate_limits": {
+                "query": self.query_limiter.snapshot(),
+                "upload": self.upload_limiter.snapshot(),
+            },
+            "concurrency": {
+                "query": self.query_gate.snapshot(),
+                "upload": self.upload_gate.snapshot(),
+            },
+        }
@@ -0,0 +1,281 @@
+"""Bulk-load a directory or zip archive of PDFs into the vector store.
+
+Usage:
+    python bulk_ingest.py /path/to/pdfs
+    python bulk_ingest.py client_documents.zip --workers 8 --batch-size 2000
+
+Text extraction and chunking run in parallel worker processes; embeddings are
+generated in large batches and written with bulk `collection.add` calls.
+Progress is checkpointed after every batch so an interrupted run can simply be
+started again with the same arguments and will skip what is already stored.
+
+Chroma does not support several processes writing to one persist directory, so
+stop the API server while ingesting and start it with CLEAR_DATA_ON_STARTUP=false
+afterwards; it then lists the ingested documents from the vector store.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Tuple
+
+from document_processor import DocumentProcessor
+
+# Extraction-only processor owned by each worker process
+_worker_processor = None
+
+
+def _init_worker():
+    global _worker_processor
+    _worker_processor = DocumentProcessor(extraction_only=True)
+
+
+def _extract(key: str, file_path: str) -> Dict[str, Any]:
+    """Worker task: extract and chunk one PDF."""
+    try:
+        pages_text, chunks = _worker_processor.extract_chunks(file_path)
+    except Exception as e:
+        return {"key": key, "error": str(e)}
+    return {"key": key, "total_pages": len(pages_text), "chunks": chunks}
+
+
+def find_pdfs(root: str) -> List[Tuple[str, str]]:
+    """Return (checkpoint key, absolute path) for every PDF under root, sorted."""
+    pdfs = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith(".pdf"):
+                path = os.path.join(dirpath, filename)
+                pdfs.append((os.path.relpath(path, root), path))
+    return sorted(pdfs)
+
+
+def document_id_for(source: str, key: str) -> str:
+    """Stable document id so a resumed run writes the same chunk ids."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{os.path.abspath(source)}::{key}"))
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"completed": {}, "failed": {}}
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    # Write-then-rename so an interrupt never leaves a truncated checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class BulkIngester:
+    def __init__(self, source: str, checkpoint_path: str, workers: int, batch_size: int, embed_batch_size: int):
+        self.source = source
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.embed_batch_size = embed_batch_size
+
+        self.processor = DocumentProcessor()
+        if not self.processor.is_persistent:
+            raise RuntimeError(
+                f"Chroma could not open {self.processor.config.CHROMA_PERSIST_DIRECTORY} persistently; "
+                "refusing to ingest into an in-memory store"
+            )
+        if self.processor.config.CLEAR_DATA_ON_STARTUP:
+            print(
+                "[Bulk] Warning: CLEAR_DATA_ON_STARTUP is enabled, so the API server will "
+                "delete these documents when it starts; set CLEAR_DATA_ON_STARTUP=false"
+            )
+        # Chroma rejects a single add larger than its SQLite-derived limit
+        self.max_write_size = getattr(self.processor.chroma_client, "max_batch_size", None) or batch_size
+        if self.batch_size > self.max_write_size:
+            print(f"[Bulk] Clamping --batch-size {self.batch_size} to Chroma's max batch size {self.max_write_size}")
+            self.batch_size = self.max_write_size
+        self.checkpoint = load_checkpoint(checkpoint_path)
+
+        # Documents extracted but not yet written to the vector store
+        self.pending: List[Dict[str, Any]] = []
+        self.pending_chunks = 0
+
+        self.pages_done = 0
+        self.chunks_done = 0
+        self.started_at = time.monotonic()
+
+    def run(self, root: str):
+        pdfs = [
+            (key, path) for key, path in find_pdfs(root)
+            if key not in self.checkpoint["completed"]
+        ]
+        skipped = len(self.checkpoint["completed"])
+        print(f"[Bulk] {len(pdfs)} PDFs to ingest ({skipped} already completed) using {self.workers} workers")
+        if not pdfs:
+            return
+
+        queue = iter(pdfs)
+        in_flight = set()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            # Keep a bounded window of submitted work so extracted chunks
+            # never pile up faster than they can be embedded
+            for key, path in queue:
+                in_flight.add(executor.submit(_extract, key, path))
+                if len(in_flight) >= self.workers * 2:
+                    break
+
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future.result())
+                    next_item = next(queue, None)
+                    if next_item is not None:
+                        in_flight.add(executor.submit(_extract, *next_item))
+
+        self._flush()
+        self._report(final=True)
+
+    def _collect(self, result: Dict[str, Any]):
+        key = result["key"]
+        if "error" in result:
+            print(f"[Bulk] Skipping {key}: {result['error']}")
+            self.checkpoint["failed"][key] = result["error"]
+            save_checkpoint(self.checkpoint_path, self.checkpoint)
+            return
+
+        self.pending.append(result)
+        self.pending_chunks += len(result["chunks"])
+        if self.pending_chunks >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """Embed and store every pending document in bulk writes."""
+        if not self.pending:
+            return
+
+        documents, metadatas, ids = [], [], []
+        ingested_at_by_document = {}
+        for item in self.pending:
+            document_id = document_id_for(self.source, item["key"])
+            item["document_id"] = document_id
+            item_documents, item_metadatas, item_ids = self.processor.build_records(
+                document_id, item["chunks"], filename=os.path.basename(item["key"])
+            )
+            ingested_at_by_document[document_id] = item_metadatas[0]["ingested_at"]
+            documents.extend(item_documents)
+            metadatas.extend(item_metadatas)
+            ids.extend(item_ids)
+
+        embeddings = self.processor.embedding_model.encode(
+            documents, batch_size=self.embed_batch_size
+        ).tolist()
+        # pending_chunks can overshoot batch_size by a whole document, so
+        # writes are sliced to stay within Chroma's per-call limit. No
+        # self-healing here: a memory fallback or store reset would lose
+        # documents the checkpoint already lists as completed
+        for start in range(0, len(ids), self.max_write_size):
+            end = start + self.max_write_size
+            self.processor.add_to_collection(
+                embeddings[start:end], documents[start:end], metadatas[start:end], ids[start:end],
+                label=f"{len(self.pending)} documents (chunks {start}-{min(end, len(ids)) - 1})",
+                self_heal=False
+            )
+
+        self.processor.record_documents([
+            {
+                "document_id": item["document_id"],
+                "filename": os.path.basename(item["key"]),
+                "ingested_at": ingested_at_by_document[item["document_id"]],
+                "total_pages": item["total_pages"],
+                "total_chunks": len(item["chunks"]),
+            }
+            for item in self.pending
+        ])
+
+        for item in self.pending:
+            self.checkpoint["completed"][item["key"]] = {
+                "document_id": item["document_id"],
+                "total_pages": item["total_pages"],
+                "total_chunks": len(item["chunks"]),
+            }
+            self.checkpoint["failed"].pop(item["key"], None)
+            self.pages_done += item["total_pages"]
+            self.chunks_done += len(item["chunks"])
+        save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+        self.pending = []
+        self.pending_chunks = 0
+        self._report()
+
+    def _report(self, final: bool = False):
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        prefix = "Finished" if final else "Progress"
+        print(
+            f"[Bulk] {prefix}: {len(self.checkpoint['completed'])} documents, "
+            f"{self.pages_done} pages, {self.chunks_done} chunks in {elapsed:.1f}s "
+            f"({self.pages_done / elapsed:.1f} pages/s, {self.chunks_done / elapsed:.1f} chunks/s)"
+        )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory or zip archive of PDFs")
+    parser.add_argument("source", help="Directory or .zip archive containing PDFs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Extraction worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="Chunks per bulk vector store write (default: 1000)")
+    parser.add_argument("--embed-batch-size", type=int, default=128,
+                        help="Chunks per embedding model forward pass (default: 128)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Progress file used to resume (default: <source>.ingest.json)")
+    args = parser.parse_args(argv)
+
+    source = args.source.rstrip(os.sep)
+    if not os.path.isdir(source) and not zipfile.is_zipfile(source):
+        print(f"{source} is neither a directory nor a zip archive", file=sys.stderr)
+        return 1
+
+    checkpoint_path = args.checkpoint or f"{source}.ingest.json"
+    try:
+        ingester = BulkIngester(
+            source,
+            checkpoint_path,
+            workers=max(args.workers, 1),
+            batch_size=max(args.batch_size, 1),
+            embed_batch_size=max(args.embed_batch_size, 1),
+        )
+        _ingest_source(ingester, source)
+    except Exception as e:
+        # Completed batches are already stored and checkpointed; the failed
+        # batch is not, so re-running picks up from there once fixed
+        print(f"[Bulk] Stopped: {e}", file=sys.stderr)
+        print(f"[Bulk] Progress is saved in {checkpoint_path}; re-run the same command to resume", file=sys.stderr)
+        return 1
+
+    failed = len(ingester.checkpoint["failed"])
+    if failed:
+        print(f"[Bulk] {failed} documents failed; see {checkpoint_path}")
+    return 0
+
+
+def _ingest_source(ingester: BulkIngester, source: str):
+    if os.path.isdir(source):
+        ingester.run(source)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with zipfile.ZipFile(source) as archive:
+            members = [
+                name for name in archive.namelist()
+                if name.lower().endswith(".pdf") and os.path.normpath(name) not in ingester.checkpoint["completed"]
+            ]
+            archive.extractall(tmp_dir, members=members)
+        ingester.run(tmp_dir)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,10 @@ class Config:
     
     # ChromaDB Configuration
     CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
+    # Wipe uploads and the vector store on startup and on /session/reset; disable
+    # to keep documents across restarts (e.g. after running bulk_ingest.py), in
+    # which case a session reset only removes documents uploaded over HTTP
+    CLEAR_DATA_ON_STARTUP = os.getenv("CLEAR_DATA_ON_STARTUP", "true").lower() in ("1", "true", "yes")
     
     # Chunking Configuration
     CHUNK_SIZE = 1000
@@ -27,3 +31,18 @@ class Config:
     # Citation Configuration
     CITATION_PREFIX = "Page"
     MAX_CITATIONS = 5
+    
+    # Admission Control Configuration (a rate of 0 disables the limit)
+    QUERY_RATE_LIMIT_PER_MINUTE = float(os.getenv("QUERY_RATE_LIMIT_PER_MINUTE", "60"))
+    QUERY_RATE_LIMIT_BURST = int(os.getenv("QUERY_RATE_LIMIT_BURST", "10"))
+    UPLOAD_RATE_LIMIT_PER_MINUTE = float(os.getenv("UPLOAD_RATE_LIMIT_PER_MINUTE", "10"))
+    UPLOAD_RATE_LIMIT_BURST = int(os.getenv("UPLOAD_RATE_LIMIT_BURST", "3"))
+    MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "8"))
+    MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", "2"))
+    QUERY_QUEUE_DEADLINE_SECONDS = float(os.getenv("QUERY_QUEUE_DEADLINE_SECONDS", "2"))
+    UPLOAD_QUEUE_DEADLINE_SECONDS = float(os.getenv("UPLOAD_QUEUE_DEADLINE_SECONDS", "10"))
+    # Fraction of the cgroup CPU quota (or load average per core outside containers)
+    CPU_SATURATION_THRESHOLD = float(os.getenv("CPU_SATURATION_THRESHOLD", "0.9"))
+    # Number of reverse proxies in front of the app that append to X-Forwarded-For
+    # (1 on Render). 0 ignores the header and rate limits by the socket peer address.
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
@@ -1,6 +1,9 @@
+import json
 import os
 import shutil
+import threading
 import uuid
+from datetime import datetime
 from typing import List, Dict, Any, Tuple
 import PyPDF2
 import pdfplumber
@@ -11,12 +14,22 @@ import tiktoken
 from config import Config
 from models import DocumentChunk, Citation
 
+# Per-document summaries stored next to the Chroma files in the persist directory
+MANIFEST_FILENAME = "document_manifest.json"
+
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(self, extraction_only: bool = False):
         self.config = Config()
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
         self.tokenizer = tiktoken.get_encoding("cl100k_base")
-        
+        # Guards self.collection, which resets and self-healing replace at runtime
+        self.collection_lock = threading.RLock()
+
+        # Extraction-only processors (e.g. bulk ingest workers) skip loading
+        # the embedding model and opening the vector store
+        if extraction_only:
+            return
+
+        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
         self._initialize_chroma()
 
     def _create_inmemory_client(self):
@@ -37,6 +50,7 @@ class DocumentProcessor:
         self.is_persistent = False
         self.chroma_client = self._create_inmemory_client()
         self.collection = self._create_collection(self.chroma_client)
+        self._load_manifest()
 
     def _initialize_chroma(self):
         """Create or re-create the Chroma client/collection with retries."""
@@ -56,19 +70,94 @@ class DocumentProcessor:
             return
 
         self.collection = self._create_collection(self.chroma_client)
+        self._load_manifest()
 
     def reset_storage(self):
         """Remove all stored embeddings and reset the persistence store."""
-        try:
-            self.collection.delete(where={})
-        except Exception:
-            # Collection may not exist yet or delete may fail if corrupted
-            pass
+        with self.collection_lock:
+            try:
+                self.collection.delete(where={})
+            except Exception:
+                # Collection may not exist yet or delete may fail if corrupted
+                pass
 
-        if self.is_persistent and os.path.exists(self.config.CHROMA_PERSIST_DIRECTORY):
-            shutil.rmtree(self.config.CHROMA_PERSIST_DIRECTORY, ignore_errors=True)
+            if self.is_persistent and os.path.exists(self.config.CHROMA_PERSIST_DIRECTORY):
+                shutil.rmtree(self.config.CHROMA_PERSIST_DIRECTORY, ignore_errors=True)
 
-        self._initialize_chroma()
+            self._initialize_chroma()
+    
+    def _manifest_path(self) -> str:
+        return os.path.join(self.config.CHROMA_PERSIST_DIRECTORY.strip(), MANIFEST_FILENAME)
+    
+    def _load_manifest(self):
+        """Load the per-document summaries kept alongside the persistent store"""
+        self.document_records = {}
+        self.has_manifest = False
+        if self.is_persistent and os.path.exists(self._manifest_path()):
+            with open(self._manifest_path()) as f:
+                self.document_records = json.load(f)
+            self.has_manifest = True
+    
+    def _save_manifest(self):
+        if not self.is_persistent:
+            return
+        # Write-then-rename so a crash never leaves a truncated manifest
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.document_records, f)
+        os.replace(tmp_path, self._manifest_path())
+        self.has_manifest = True
+    
+    def record_documents(self, records: List[Dict[str, Any]]):
+        """Store one summary per document so listing them never scans chunks"""
+        with self.collection_lock:
+            for record in records:
+                self.document_records[record["document_id"]] = record
+            self._save_manifest()
+    
+    def get_stored_documents(self) -> List[Dict[str, Any]]:
+        """Summaries of every document in the store, read from the manifest"""
+        with self.collection_lock:
+            if not self.has_manifest and self.collection.count():
+                # Store written before the manifest existed: rebuild it once
+                self.record_documents(self._scan_document_records())
+            return list(self.document_records.values())
+    
+    def _scan_document_records(self, page_size: int = 10000) -> List[Dict[str, Any]]:
+        """Summarize every document in the collection from its chunk metadata"""
+        documents = {}
+        offset = 0
+        
+        while True:
+            results = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            metadatas = results['metadatas']
+            if not metadatas:
+                break
+            
+            for metadata in metadatas:
+                document = documents.setdefault(metadata['document_id'], {
+                    "document_id": metadata['document_id'],
+                    "filename": metadata.get('filename') or metadata['document_id'],
+                    "ingested_at": metadata.get('ingested_at'),
+                    "pages": set(),
+                    "total_chunks": 0
+                })
+                document["pages"].add(metadata['page_number'])
+                document["total_chunks"] += 1
+            
+            offset += len(metadatas)
+        
+        for document in documents.values():
+            document["total_pages"] = len(document.pop("pages"))
+        
+        return list(documents.values())
+    
+    def delete_document(self, document_id: str):
+        """Remove all chunks belonging to a document"""
+        with self.collection_lock:
+            self.collection.delete(where={"document_id": document_id})
+            if self.document_records.pop(document_id, None) is not None:
+                self._save_manifest()
     
     def extract_text_from_pdf(self, file_path: str) -> List[Tuple[str, int]]:
         """Extract text from PDF with page numbers"""
@@ -122,11 +211,8 @@ class DocumentProcessor:
         
         return chunks
     
-    def process_document(self, file_path: str, document_id: str = None) -> Dict[str, Any]:
-        """Process a PDF document and store in vector database"""
-        if not document_id:
-            document_id = str(uuid.uuid4())
-        
+    def extract_chunks(self, file_path: str) -> Tuple[List[Tuple[str, int]], List[DocumentChunk]]:
+        """Extract and chunk a PDF, returning its pages and chunks"""
         # Extract text from PDF
         pages_text = self.extract_text_from_pdf(file_path)
         
@@ -140,56 +226,91 @@ class DocumentProcessor:
             chunks = self.chunk_text(page_text, page_number)
             all_chunks.extend(chunks)
         
-        # Generate embeddings and store in ChromaDB
-        chunk_contents = [chunk.content for chunk in all_chunks]
-        embeddings = self.embedding_model.encode(chunk_contents).tolist()
-        
-        # Prepare metadata for ChromaDB
+        return pages_text, all_chunks
+    
+    def build_records(self, document_id: str, chunks: List[DocumentChunk], filename: str = "") -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+        """Prepare ChromaDB documents, metadata and ids for a document's chunks"""
+        chunk_contents = [chunk.content for chunk in chunks]
         metadatas = []
         ids = []
+        ingested_at = datetime.now().isoformat()
         
-        for i, chunk in enumerate(all_chunks):
+        for i, chunk in enumerate(chunks):
             metadata = {
                 "document_id": document_id,
                 "page_number": chunk.page_number,
                 "chunk_index": chunk.chunk_index,
-                "content": chunk.content[:500]  # Store first 500 chars for reference
+                "content": chunk.content[:500],  # Store first 500 chars for reference
+                # Lets a restarted server rebuild its document list from the store
+                "filename": filename,
+                "ingested_at": ingested_at
             }
             metadatas.append(metadata)
             ids.append(f"{document_id}_{i}")
         
-        # Store in ChromaDB with self-healing for compaction errors
-        try:
-            self.collection.add(
-                embeddings=embeddings,
-                documents=chunk_contents,
-                metadatas=metadatas,
-                ids=ids
-            )
-            print(f"[Chroma] Added {len(chunk_contents)} chunks for document {document_id}. Total count: {self.collection.count()}")
-        except Exception as e:
-            # Handle compaction/metadata corruption / read-only issues
-            error_message = str(e).lower()
-            if "readonly" in error_message or "read-only" in error_message:
-                self._fallback_to_memory("persistent storage opened read-only")
-                self.collection.add(
-                    embeddings=embeddings,
-                    documents=chunk_contents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                print(f"[Chroma] Added {len(chunk_contents)} chunks (memory fallback) for document {document_id}. Total count: {self.collection.count()}")
-            elif "compaction" in error_message or "metadata segment" in error_message:
-                self.reset_storage()
+        return chunk_contents, metadatas, ids
+    
+    def add_to_collection(self, embeddings: List[List[float]], documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str], label: str, self_heal: bool = True):
+        """Store records in ChromaDB with self-healing for compaction errors.
+
+        Self-healing falls back to memory or resets the store, discarding what
+        was written before; callers that track progress pass self_heal=False
+        to get the original error instead.
+        """
+        with self.collection_lock:
+            try:
                 self.collection.add(
                     embeddings=embeddings,
-                    documents=chunk_contents,
+                    documents=documents,
                     metadatas=metadatas,
                     ids=ids
                 )
-                print(f"[Chroma] Added {len(chunk_contents)} chunks after reset for document {document_id}. Total count: {self.collection.count()}")
-            else:
-                raise
+                print(f"[Chroma] Added {len(documents)} chunks for {label}. Total count: {self.collection.count()}")
+            except Exception as e:
+                if not self_heal:
+                    raise
+                # Handle compaction/metadata corruption / read-only issues
+                error_message = str(e).lower()
+                if "readonly" in error_message or "read-only" in error_message:
+                    self._fallback_to_memory("persistent storage opened read-only")
+                    self.collection.add(
+                        embeddings=embeddings,
+                        documents=documents,
+                        metadatas=metadatas,
+                        ids=ids
+                    )
+                    print(f"[Chroma] Added {len(documents)} chunks (memory fallback) for {label}. Total count: {self.collection.count()}")
+                elif "compaction" in error_message or "metadata segment" in error_message:
+                    self.reset_storage()
+                    self.collection.add(
+                        embeddings=embeddings,
+                        documents=documents,
+                        metadatas=metadatas,
+                        ids=ids
+                    )
+                    print(f"[Chroma] Added {len(documents)} chunks after reset for {label}. Total count: {self.collection.count()}")
+                else:
+                    raise
+    
+    def process_document(self, file_path: str, document_id: str = None, filename: str = "") -> Dict[str, Any]:
+        """Process a PDF document and store in vector database"""
+        if not document_id:
+            document_id = str(uuid.uuid4())
+        
+        pages_text, all_chunks = self.extract_chunks(file_path)
+        
+        # Generate embeddings and store in ChromaDB
+        chunk_contents, metadatas, ids = self.build_records(document_id, all_chunks, filename=filename)
+        embeddings = self.embedding_model.encode(chunk_contents).tolist()
+        
+        self.add_to_collection(embeddings, chunk_contents, metadatas, ids, label=f"document {document_id}")
+        self.record_documents([{
+            "document_id": document_id,
+            "filename": filename or document_id,
+            "ingested_at": metadatas[0]["ingested_at"],
+            "total_pages": len(pages_text),
+            "total_chunks": len(all_chunks)
+        }])
         
         return {
             "document_id": document_id,
@@ -209,11 +330,12 @@ class DocumentProcessor:
             where_clause["document_id"] = document_id
         
         # Search in ChromaDB
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            where=where_clause if where_clause else None
-        )
+        with self.collection_lock:
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=where_clause if where_clause else None
+            )
         
         # Format results and filter by relevance threshold
         formatted_results = []
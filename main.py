@@ -1,16 +1,19 @@
 import asyncio
 import shutil
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 import os
 import uuid
 from datetime import datetime
 from typing import List, Optional
 import aiofiles
 
+from admission import AdmissionController
 from config import Config
 from models import DocumentInfo, QueryRequest, QueryResponse
 from document_processor import DocumentProcessor
@@ -18,6 +21,24 @@ from rag_system import RAGSystem
 
 app = FastAPI(title="Document Analyzer", version="1.0.0")
 
+
+# Registered before CORS so that early rejections still carry CORS headers
+@app.middleware("http")
+async def upload_admission(request: Request, call_next):
+    """Reject oversized or rate-limited uploads before the body is read"""
+    if request.method == "POST" and request.url.path == "/upload":
+        try:
+            admission.check_upload_request(
+                _client_id(request), request.headers.get("content-length")
+            )
+        except HTTPException as e:
+            return JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers=e.headers,
+            )
+    return await call_next(request)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +52,7 @@ app.add_middleware(
 config = Config()
 document_processor = DocumentProcessor()
 rag_system = RAGSystem(document_processor=document_processor)
+admission = AdmissionController(config)
 
 # Create necessary directories
 os.makedirs(config.UPLOAD_DIRECTORY, exist_ok=True)
@@ -40,9 +62,53 @@ os.makedirs(config.CHROMA_PERSIST_DIRECTORY, exist_ok=True)
 if os.path.exists("frontend/build"):
     app.mount("/static", StaticFiles(directory="frontend/build/static"), name="static")
 
+
+class SessionLock:
+    """Uploads, queries and deletes share the session; /session/reset runs alone.
+
+    Processing runs in the threadpool, so a reset must wait for in-flight work
+    to drain before wiping the vector store, and new work waits for the reset.
+    """
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self._active = 0
+        self._resetting = False
+
+    @asynccontextmanager
+    async def shared(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._resetting)
+            self._active += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def exclusive(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._resetting)
+            self._resetting = True
+            await self._condition.wait_for(lambda: self._active == 0)
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._resetting = False
+                self._condition.notify_all()
+
+
+UPLOAD_COPY_CHUNK_BYTES = 1024 * 1024
+
 # Store for document metadata
 documents_store = {}
-session_lock = asyncio.Lock()
+# Documents uploaded over HTTP; with CLEAR_DATA_ON_STARTUP disabled these are
+# the only ones /session/reset removes, leaving the persisted store intact
+session_uploads = set()
+session_lock = SessionLock()
 
 
 def _clean_directory(directory: str):
@@ -62,18 +128,62 @@ def _clean_directory(directory: str):
             print(f"Failed to remove {item_path}: {exc}")
 
 
+def _client_id(request: Request) -> str:
+    """Identify the caller for rate limiting.
+
+    X-Forwarded-For is only honoured behind TRUSTED_PROXY_HOPS proxies, and
+    then the entry that many hops from the right is used: everything to the
+    left of it was supplied by the client and can be forged.
+    """
+    hops = config.TRUSTED_PROXY_HOPS
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if hops > 0 and forwarded_for:
+        entries = [entry.strip() for entry in forwarded_for.split(",") if entry.strip()]
+        if entries:
+            return entries[-min(hops, len(entries))]
+    return request.client.host if request.client else "unknown"
+
+
 def clear_document_data():
     """Remove uploaded files, reset vector store, and clear in-memory state."""
     documents_store.clear()
+    session_uploads.clear()
     _clean_directory(config.UPLOAD_DIRECTORY)
     document_processor.reset_storage()
     rag_system.document_processor.reset_storage()
 
 
+def clear_session_uploads():
+    """Remove only documents uploaded over HTTP, keeping the persisted store."""
+    for document_id in list(session_uploads):
+        document_processor.delete_document(document_id)
+        documents_store.pop(document_id, None)
+    session_uploads.clear()
+    _clean_directory(config.UPLOAD_DIRECTORY)
+
+
+def load_stored_documents():
+    """Rebuild the document list from the vector store, e.g. after a bulk ingest."""
+    for document in document_processor.get_stored_documents():
+        ingested_at = document["ingested_at"]
+        documents_store[document["document_id"]] = DocumentInfo(
+            document_id=document["document_id"],
+            filename=document["filename"],
+            upload_date=datetime.fromisoformat(ingested_at) if ingested_at else datetime.now(),
+            total_pages=document["total_pages"],
+            total_chunks=document["total_chunks"],
+            status="processed"
+        )
+    print(f"[Startup] Loaded {len(documents_store)} stored documents")
+
+
 @app.on_event("startup")
 async def startup_cleanup():
-    # Ensure a clean slate whenever the service restarts
-    clear_document_data()
+    if config.CLEAR_DATA_ON_STARTUP:
+        # Ensure a clean slate whenever the service restarts
+        clear_document_data()
+    else:
+        await run_in_threadpool(load_stored_documents)
 
 @app.get("/")
 async def read_root():
@@ -87,18 +197,26 @@ async def health():
     """Health check endpoint"""
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/metrics")
+async def metrics():
+    """Admission control state: rate limiters, concurrency slots and CPU load"""
+    return admission.snapshot()
+
 @app.post("/upload", response_model=DocumentInfo)
 async def upload_document(file: UploadFile = File(...)):
     """Upload and process a document"""
+    # Rate limits and the Content-Length check already ran in upload_admission
     
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
-    # Validate file size
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
+    # Validate file size from the spooled upload without loading it into memory
+    file_size = file.size
+    if file_size is None:
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+        file.file.seek(0)
     
     if file_size > config.MAX_FILE_SIZE_MB * 1024 * 1024:
         raise HTTPException(
@@ -106,23 +224,34 @@ async def upload_document(file: UploadFile = File(...)):
             detail=f"File size exceeds {config.MAX_FILE_SIZE_MB}MB limit"
         )
     
+    async with admission.upload_slot():
+        async with session_lock.shared():
+            return await _process_upload(file)
+
+
+async def _process_upload(file: UploadFile) -> DocumentInfo:
+    original_filename = file.filename
+
     # Generate unique document ID
     document_id = str(uuid.uuid4())
-    filename = f"{document_id}_{file.filename}"
+    filename = f"{document_id}_{original_filename}"
     file_path = os.path.join(config.UPLOAD_DIRECTORY, filename)
     
-    # Save file
+    # Save file, streaming so queued and running uploads never hold whole PDFs in memory
     async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
+        while chunk := await file.read(UPLOAD_COPY_CHUNK_BYTES):
+            await f.write(chunk)
     
     try:
         # Process document
-        result = document_processor.process_document(file_path, document_id)
+        result = await run_in_threadpool(
+            document_processor.process_document, file_path, document_id, original_filename
+        )
         
         # Store document info
         document_info = DocumentInfo(
             document_id=document_id,
-            filename=file.filename,
+            filename=original_filename,
             upload_date=datetime.now(),
             total_pages=result['total_pages'],
             total_chunks=result['total_chunks'],
@@ -130,6 +259,7 @@ async def upload_document(file: UploadFile = File(...)):
         )
         
         documents_store[document_id] = document_info
+        session_uploads.add(document_id)
         
         return document_info
     
@@ -152,8 +282,14 @@ async def get_document(document_id: str):
     return documents_store[document_id]
 
 @app.post("/query", response_model=QueryResponse)
-async def query_document(query_request: QueryRequest):
+async def query_document(request: Request, query_request: QueryRequest):
     """Query documents for answers with citations"""
+    async with admission.admit_query(_client_id(request)):
+        async with session_lock.shared():
+            return await _run_query(query_request)
+
+
+async def _run_query(query_request: QueryRequest) -> QueryResponse:
     try:
         # If document_id is provided, verify it exists
         if query_request.document_id and query_request.document_id not in documents_store:
@@ -165,7 +301,7 @@ async def query_document(query_request: QueryRequest):
             f"available_docs={list(documents_store.keys())}"
         )
         
-        response = rag_system.query_document(query_request)
+        response = await run_in_threadpool(rag_system.query_document, query_request)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
@@ -174,8 +310,13 @@ async def query_document(query_request: QueryRequest):
 @app.post("/session/reset")
 async def reset_session():
     """Clear all uploaded documents and associated vector data."""
-    async with session_lock:
-        clear_document_data()
+    async with session_lock.exclusive():
+        if config.CLEAR_DATA_ON_STARTUP:
+            await run_in_threadpool(clear_document_data)
+        else:
+            # The vector store is persistent (e.g. bulk-ingested), so only
+            # drop what this session uploaded
+            await run_in_threadpool(clear_session_uploads)
     return {"status": "reset"}
 
 
@@ -186,7 +327,8 @@ async def get_document_summary(document_id: str):
         raise HTTPException(status_code=404, detail="Document not found")
     
     try:
-        summary = rag_system.get_document_summary(document_id)
+        async with session_lock.shared():
+            summary = await run_in_threadpool(rag_system.get_document_summary, document_id)
         return summary
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting document summary: {str(e)}")
@@ -199,12 +341,12 @@ async def delete_document(document_id: str):
     
     try:
         # Remove from ChromaDB
-        document_processor.collection.delete(
-            where={"document_id": document_id}
-        )
+        async with session_lock.shared():
+            await run_in_threadpool(document_processor.delete_document, document_id)
         
         # Remove from store
-        del documents_store[document_id]
+        documents_store.pop(document_id, None)
+        session_uploads.discard(document_id)
         
         return {"message": "Document deleted successfully"}
     
@@ -117,11 +117,12 @@ class RAGSystem:
     def get_document_summary(self, document_id: str) -> Dict[str, Any]:
         """Get summary information about a processed document"""
         # Query all chunks for this document
-        results = self.document_processor.collection.query(
-            query_texts=[""],
-            n_results=1000,  # Get all chunks
-            where={"document_id": document_id} if document_id else None
-        )
+        with self.document_processor.collection_lock:
+            results = self.document_processor.collection.query(
+                query_texts=[""],
+                n_results=1000,  # Get all chunks
+                where={"document_id": document_id} if document_id else None
+            )
         
         if not results['documents'][0]:
             return {"error": "Document not found"}